@@ -0,0 +1,6 @@
+-- One library per call, the way `libadmin upload` inserts them.
+SELECT api.insert_library(json_build_object(
+    'fscs_id', 'BN' || nextval('bench_ids'),
+    'name', 'BENCHMARK PUBLIC LIBRARY',
+    'address', '1 Bench Street, Benchville, 00000',
+    'api_key', md5(random()::text)));
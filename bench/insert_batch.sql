@@ -0,0 +1,7 @@
+-- :batch libraries per call, as one JSON array.
+SELECT api.insert_library(json_agg(json_build_object(
+    'fscs_id', 'BN' || nextval('bench_ids'),
+    'name', 'BENCHMARK PUBLIC LIBRARY',
+    'address', '1 Bench Street, Benchville, 00000',
+    'api_key', md5(random()::text))))
+FROM generate_series(1, :batch);
@@ -0,0 +1,2 @@
+-- One login per transaction, against a `library` key hashed by run.sh.
+SELECT api.login('BN-LOGIN', 'bench-login-key');
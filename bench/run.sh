@@ -0,0 +1,61 @@
+#!/usr/bin/env bash
+# Benchmarks logins and inserts against the docker-compose database.
+#
+# source db.env ; docker compose up -d ; bench/run.sh [cost ...]
+#
+# Each cost is a bcrypt work factor for `library` keys. The default
+# compares 6 (the pgcrypto default, and what every key used to get)
+# against LIBRARY_BF_COST. Everything the benchmark inserts uses
+# a `BN` prefix, and is removed again before and after each run.
+#
+# BENCH_DURATION, BENCH_CLIENTS and BENCH_BATCH tune the runs.
+# BENCH_BATCH=0 skips the batch insert, which needs the set-based
+# insert_library.
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+
+COSTS=${*:-"6 ${LIBRARY_BF_COST:-4}"}
+DURATION=${BENCH_DURATION:-10}
+CLIENTS=${BENCH_CLIENTS:-4}
+BATCH=${BENCH_BATCH:-50}
+
+# Runs psql in the db container, with the given library key cost.
+db_psql() {
+    local cost=$1
+    shift
+    docker compose exec -T -e PGOPTIONS="-c app.library_bf_cost=${cost}" db \
+        psql -q -v ON_ERROR_STOP=1 -U "${POSTGRES_USER}" -d "${POSTGRES_DB}" "$@"
+}
+
+# Runs a pgbench script in the db container, and prints its tps.
+db_pgbench() {
+    local cost=$1
+    shift
+    docker compose exec -T -e PGOPTIONS="-c app.library_bf_cost=${cost}" db \
+        pgbench -n -M prepared -T "${DURATION}" -c "${CLIENTS}" -j "${CLIENTS}" \
+        -U "${POSTGRES_USER}" "$@" "${POSTGRES_DB}" \
+        | awk '/^tps/ { print $3; exit }'
+}
+
+cleanup() {
+    db_psql 6 -c "DELETE FROM data.libraries WHERE fscs_id LIKE 'BN%';" \
+        -c "DELETE FROM auth.users WHERE username LIKE 'BN%';" \
+        -c "DROP SEQUENCE IF EXISTS bench_ids;"
+}
+trap cleanup EXIT
+
+printf "%-6s %12s %12s %18s\n" "cost" "login/sec" "insert/sec" "batch insert/sec"
+for cost in ${COSTS}; do
+    cleanup
+    db_psql "${cost}" -c "CREATE SEQUENCE bench_ids;" \
+        -c "INSERT INTO auth.users (username, api_key, role) VALUES ('BN-LOGIN', 'bench-login-key', 'library');"
+    login=$(db_pgbench "${cost}" -f /bench/login.sql)
+    insert=$(db_pgbench "${cost}" -f /bench/insert.sql)
+    batch="-"
+    if [ "${BATCH}" -gt 0 ]; then
+        tps=$(db_pgbench "${cost}" -D batch="${BATCH}" -f /bench/insert_batch.sql)
+        batch=$(awk -v tps="${tps}" -v n="${BATCH}" 'BEGIN { printf "%.1f", tps * n }')
+    fi
+    printf "%-6s %12s %12s %18s\n" "${cost}" "${login}" "${insert}" "${batch}"
+done
@@ -22,11 +22,47 @@ create constraint trigger ensure_user_role_exists
 
 create extension if not exists pgcrypto;
 
+-- The bcrypt work factor is configurable, and kept separate for
+-- library keys and admin keys. Library keys are long, generated
+-- passphrases and are inserted in bulk, so they can use a cheaper
+-- cost than admin keys. Set these the same way as app.jwt_secret:
+--
+--   postgres -c app.library_bf_cost=4 -c app.admin_bf_cost=8
+--
+-- Unset values fall back to 6, the pgcrypto default for gen_salt('bf').
+-- bcrypt only accepts costs from 4 to 31; anything else is rejected
+-- here, by name, rather than failing deep inside gen_salt().
+-- Existing hashes carry their own cost, so changing these only
+-- affects keys that are inserted or updated afterwards.
+create or replace function
+auth.bf_cost(role text) returns integer as $$
+declare
+  _setting text := case when bf_cost.role = 'library'
+    then 'app.library_bf_cost'
+    else 'app.admin_bf_cost'
+  end;
+  _value text := nullif(current_setting(_setting, true), '');
+  _cost integer := 0;
+begin
+  if _value is null then
+    return 6;
+  end if;
+  if _value ~ '^[0-9]{1,2}$' then
+    _cost := _value::integer;
+  end if;
+  if _cost not between 4 and 31 then
+    raise invalid_parameter_value using message =
+      _setting || ' must be a bcrypt cost from 4 to 31, not ' || quote_literal(_value);
+  end if;
+  return _cost;
+end
+$$ language plpgsql stable;
+
 create or replace function
 auth.encrypt_pass() returns trigger as $$
 begin
   if tg_op = 'INSERT' or new.api_key <> old.api_key then
-    new.api_key = crypt(new.api_key, gen_salt('bf'));
+    new.api_key = crypt(new.api_key, gen_salt('bf', auth.bf_cost(new.role)));
   end if;
   return new;
 end
@@ -1,14 +1,42 @@
+-- The library RPCs are plain SQL functions that work on sets of rows.
+-- Each one takes either a single JSON object (what `libadmin` sends)
+-- or a JSON array of objects, so that bulk onboarding can go through
+-- one call and one statement instead of one round-trip per library.
+CREATE OR REPLACE FUNCTION public.json_rows(jsn JSON)
+    RETURNS SETOF JSON
+AS $$
+    SELECT json_array_elements(
+        CASE json_typeof(jsn)
+            WHEN 'array' THEN jsn
+            ELSE json_build_array(jsn)
+        END);
+$$ LANGUAGE sql IMMUTABLE;
+
+-- If an fscs_id appears more than once, the first object wins, as it
+-- would with one insert per object.
 CREATE OR REPLACE FUNCTION api.insert_library(jsn JSON)
     RETURNS JSON
 AS $$
-BEGIN
-    INSERT INTO data.libraries (fscs_id, name, address) VALUES (jsn->>'fscs_id', jsn->>'name', jsn->>'address')
-    ON CONFLICT DO NOTHING;
-    INSERT INTO auth.users (username, api_key, role) VALUES (jsn->>'fscs_id', jsn->>'api_key', 'library')
-    ON CONFLICT DO NOTHING;
-    RETURN '{"result":"OK"}'::json;
-END;
-$$ LANGUAGE 'plpgsql' SECURITY DEFINER;
+    WITH src AS (
+        SELECT DISTINCT ON (r.fscs_id) r.fscs_id, r.name, r.address, r.api_key
+        FROM public.json_rows(jsn) WITH ORDINALITY AS t(e, ord),
+            json_to_record(t.e) AS r(fscs_id text, name text, address text, api_key text)
+        ORDER BY r.fscs_id, t.ord
+    ), inserted_libraries AS (
+        INSERT INTO data.libraries (fscs_id, name, address)
+            SELECT fscs_id, name, address FROM src
+            ON CONFLICT DO NOTHING
+    ), inserted_users AS (
+        -- Skip existing users up front. ON CONFLICT only fires after the
+        -- encrypt_pass trigger has already paid for a bcrypt hash.
+        INSERT INTO auth.users (username, api_key, role)
+            SELECT fscs_id, api_key, 'library' FROM src
+            WHERE NOT EXISTS (
+                SELECT 1 FROM auth.users WHERE users.username = src.fscs_id)
+            ON CONFLICT DO NOTHING
+    )
+    SELECT '{"result":"OK"}'::json;
+$$ LANGUAGE sql SECURITY DEFINER;
 
 -- For testing the authenticated API.
 CREATE OR REPLACE FUNCTION api.meaning()
@@ -21,75 +49,80 @@ $$ LANGUAGE 'plpgsql';
 
 DROP FUNCTION IF EXISTS api.delete_library;
 CREATE OR REPLACE FUNCTION api.delete_library(jsn JSON)
-	RETURNS JSON
-	LANGUAGE plpgsql
-AS $$
-DECLARE 
-	libraries_deleted INTEGER;
-    users_deleted INTEGER;
-	BEGIN
-		DELETE FROM data.libraries WHERE data.libraries.fscs_id = jsn->>'fscs_id';
-		GET DIAGNOSTICS libraries_deleted = ROW_COUNT;  
-        DELETE FROM auth.users WHERE auth.users.username = jsn->>'fscs_id';
-		GET DIAGNOSTICS users_deleted = ROW_COUNT;  
-		RETURN json_build_object(
-            'libraries_deleted', libraries_deleted, 
-            'users_deleted', users_deleted
-            );
-	END;
-$$
-SECURITY DEFINER
-;
-  
--- https://stackoverflow.com/questions/28921355/how-do-i-check-if-a-json-key-exists-in-postgres
-CREATE FUNCTION key_exists(some_json JSON, outer_key TEXT)
-RETURNS boolean AS $$
-BEGIN
-    RETURN (some_json->outer_key) IS NOT NULL;
-END;
-$$ LANGUAGE plpgsql;
-
-DROP FUNCTION IF EXISTS do_update;
-CREATE OR REPLACE FUNCTION do_update(jsn JSON, key TEXT)
-	RETURNS JSON
-	LANGUAGE plpgsql
+    RETURNS JSON
 AS $$
-DECLARE
-    rows_updated INTEGER;
-BEGIN
-        UPDATE data.libraries SET address = jsn->>'address'
-            WHERE fscs_id = jsn->>'fscs_id';
-        GET DIAGNOSTICS rows_updated = ROW_COUNT;  
-        RETURN json_build_object('updated', 'address', 'rows_updated', rows_updated);
-END;
-$$ 
-SECURITY DEFINER;
+    WITH src AS (
+        SELECT e->>'fscs_id' AS fscs_id FROM public.json_rows(jsn) AS e
+    ), deleted_libraries AS (
+        DELETE FROM data.libraries USING src
+            WHERE libraries.fscs_id = src.fscs_id
+            RETURNING 1
+    ), deleted_users AS (
+        DELETE FROM auth.users USING src
+            WHERE users.username = src.fscs_id
+            RETURNING 1
+    )
+    SELECT json_build_object(
+        'libraries_deleted', (SELECT count(*) FROM deleted_libraries),
+        'users_deleted', (SELECT count(*) FROM deleted_users)
+        );
+$$ LANGUAGE sql SECURITY DEFINER;
 
+-- Only one field is updated per object. As before, the first of
+-- address, name, tag, api_key present in the object wins.
+-- There is no tag column (yet), so a tag update matches no rows.
+-- Objects are folded down to one row per fscs_id before updating, so
+-- several objects can change different fields of the same library.
+-- If the same field is given more than once, the last one wins.
+-- `updated` lists the fields of the rows that were actually updated.
 DROP FUNCTION IF EXISTS api.update_library;
 CREATE OR REPLACE FUNCTION api.update_library(jsn JSON)
-	RETURNS JSON
-	LANGUAGE plpgsql
+    RETURNS JSON
 AS $$
-DECLARE
-    rows_updated INTEGER;
-BEGIN
-    IF key_exists(jsn, 'address') = TRUE
-    THEN
-        RETURN do_update(jsn, 'address');
-    ELSIF key_exists(jsn, 'name') = TRUE
-    THEN
-        RETURN do_update(jsn, 'name');
-    ELSIF key_exists(jsn, 'tag') = TRUE
-    THEN
-        RETURN do_update(jsn, 'tag');
-    ELSIF key_exists(jsn, 'api_key') = TRUE
-    THEN
-        UPDATE auth.users SET api_key = jsn->>'api_key'
-            WHERE username = jsn->>'fscs_id';
-        GET DIAGNOSTICS rows_updated = ROW_COUNT;  
-        RETURN json_build_object('updated', 'api_key', 'rows_updated', rows_updated);
-    END IF;
-    RETURN json_build_object('updated', '');
-END;
-$$
-SECURITY DEFINER;
\ No newline at end of file
+    WITH src AS (
+        SELECT t.e->>'fscs_id' AS fscs_id,
+            CASE
+                WHEN t.e->'address' IS NOT NULL THEN 'address'
+                WHEN t.e->'name' IS NOT NULL THEN 'name'
+                WHEN t.e->'tag' IS NOT NULL THEN 'tag'
+                WHEN t.e->'api_key' IS NOT NULL THEN 'api_key'
+            END AS field,
+            t.e,
+            t.ord
+        FROM public.json_rows(jsn) WITH ORDINALITY AS t(e, ord)
+    ), per_library AS (
+        SELECT fscs_id,
+            coalesce(bool_or(field = 'address'), false) AS set_address,
+            (array_agg(e->>'address' ORDER BY ord DESC) FILTER (WHERE field = 'address'))[1] AS address,
+            coalesce(bool_or(field = 'name'), false) AS set_name,
+            (array_agg(e->>'name' ORDER BY ord DESC) FILTER (WHERE field = 'name'))[1] AS name,
+            coalesce(bool_or(field = 'api_key'), false) AS set_api_key,
+            (array_agg(e->>'api_key' ORDER BY ord DESC) FILTER (WHERE field = 'api_key'))[1] AS api_key
+        FROM src
+        GROUP BY fscs_id
+    ), updated_libraries AS (
+        UPDATE data.libraries SET
+            address = CASE WHEN per_library.set_address THEN per_library.address ELSE libraries.address END,
+            name = CASE WHEN per_library.set_name THEN per_library.name ELSE libraries.name END
+            FROM per_library
+            WHERE libraries.fscs_id = per_library.fscs_id
+                AND (per_library.set_address OR per_library.set_name)
+            RETURNING per_library.set_address, per_library.set_name
+    ), updated_users AS (
+        UPDATE auth.users SET api_key = per_library.api_key
+            FROM per_library
+            WHERE users.username = per_library.fscs_id
+                AND per_library.set_api_key
+            RETURNING 1
+    ), updated_fields AS (
+        SELECT 'address' AS field FROM updated_libraries WHERE set_address
+        UNION
+        SELECT 'name' FROM updated_libraries WHERE set_name
+        UNION
+        SELECT 'api_key' FROM updated_users
+    )
+    SELECT json_build_object(
+        'updated', coalesce((SELECT string_agg(field, ',' ORDER BY field) FROM updated_fields), ''),
+        'rows_updated', (SELECT count(*) FROM updated_libraries) + (SELECT count(*) FROM updated_users)
+        );
+$$ LANGUAGE sql SECURITY DEFINER;
@@ -39,4 +39,118 @@ def test_update_db():
         else:
             assert False
     else:
-        assert False
\ No newline at end of file
+        assert False
+
+# The insert RPC also takes a list of rows.
+# Like test_insert_library, this only inserts on a clean DB.
+def test_insert_library_batch():
+    rows = [
+        {
+            "fscs_id": "EN0004-001",
+            "address": "3 Endor Place, Endor, 30000",
+            "name": "EWOK VILLAGE, ENDOR PUBLIC LIBRARY",
+            "api_key": "it-is-a-trap"
+        },
+        {
+            "fscs_id": "EN0005-001",
+            "address": "4 Endor Place, Endor, 40000",
+            "name": "SHIELD GENERATOR, ENDOR PUBLIC LIBRARY",
+            "api_key": "yub-nub-yub-nub"
+        }
+    ]
+    r = util.insert_library("libraries", rows)
+    assert r["result"] == "OK"
+    for row in rows:
+        assert util.check_library_exists(row, "fscs_id")
+
+# A repeated fscs_id in one batch keeps the first object, as separate
+# inserts would. Only the first API key can log in.
+def test_insert_library_batch_repeated_id():
+    rows = [
+        {
+            "fscs_id": "EN0010-001",
+            "address": "11 Endor Place, Endor, 11000",
+            "name": "SCOUT TROOPER, ENDOR PUBLIC LIBRARY",
+            "api_key": "first-scout-key"
+        },
+        {
+            "fscs_id": "EN0010-001",
+            "address": "12 Endor Place, Endor, 12000",
+            "name": "SPEEDER BIKE, ENDOR PUBLIC LIBRARY",
+            "api_key": "second-scout-key"
+        }
+    ]
+    util.post_rpc("delete_library", {"fscs_id": "EN0010-001"})
+    r = util.insert_library("libraries", rows)
+    assert r["result"] == "OK"
+    q = util.get_library_data("EN0010-001")
+    assert q[0]['name'] == "SCOUT TROOPER, ENDOR PUBLIC LIBRARY"
+    assert util.login("EN0010-001", "first-scout-key").status_code == 200
+    assert util.login("EN0010-001", "second-scout-key").status_code != 200
+
+# A name update sets the name, and leaves the address alone.
+def test_update_db_name():
+    before = util.get_library_data("EN0001-001")
+    b = libadmin.build_body("EN0001-001", None, "ENDOR, NEW PUBLIC LIBRARY OF", None, None)
+    r = libadmin.update_db(b)
+    assert r == {'updated': 'name', 'rows_updated': 1}
+    after = util.get_library_data("EN0001-001")
+    assert after[0]['name'] == "ENDOR, NEW PUBLIC LIBRARY OF"
+    assert after[0]['address'] == before[0]['address']
+
+# There is no tag column, so a tag update changes nothing.
+def test_update_db_tag():
+    before = util.get_library_data("EN0001-001")
+    b = libadmin.build_body("EN0001-001", None, None, "circulation desk", None)
+    r = libadmin.update_db(b)
+    assert r == {'updated': '', 'rows_updated': 0}
+    after = util.get_library_data("EN0001-001")
+    assert after == before
+
+# Two objects for the same library, with different fields, both apply.
+def test_update_library_batch():
+    rows = [
+        {"fscs_id": "EN0006-001", "address": "5 Endor Place, Endor, 50000",
+         "name": "BUNKER, ENDOR PUBLIC LIBRARY", "api_key": "bunker-key"},
+        {"fscs_id": "EN0007-001", "address": "6 Endor Place, Endor, 60000",
+         "name": "LANDING PAD, ENDOR PUBLIC LIBRARY", "api_key": "landing-key"}
+    ]
+    util.insert_library("libraries", rows)
+    r = util.post_rpc("update_library", [
+        {"fscs_id": "EN0006-001", "address": "7 Endor Place, Endor, 70000"},
+        {"fscs_id": "EN0006-001", "name": "BACK DOOR, ENDOR PUBLIC LIBRARY"},
+        {"fscs_id": "EN0007-001", "address": "8 Endor Place, Endor, 80000"}
+    ])
+    assert r == {'updated': 'address,name', 'rows_updated': 2}
+    q = util.get_library_data("EN0006-001")
+    assert q[0]['address'] == "7 Endor Place, Endor, 70000"
+    assert q[0]['name'] == "BACK DOOR, ENDOR PUBLIC LIBRARY"
+    q = util.get_library_data("EN0007-001")
+    assert q[0]['address'] == "8 Endor Place, Endor, 80000"
+
+# The same field twice for one library: the last one wins.
+def test_update_library_batch_api_key():
+    row = {"fscs_id": "EN0006-001", "address": "5 Endor Place, Endor, 50000",
+           "name": "BUNKER, ENDOR PUBLIC LIBRARY", "api_key": "bunker-key"}
+    util.insert_library("libraries", row)
+    r = util.post_rpc("update_library", [
+        {"fscs_id": "EN0006-001", "api_key": "first-key"},
+        {"fscs_id": "EN0006-001", "api_key": "second-key"}
+    ])
+    assert r == {'updated': 'api_key', 'rows_updated': 1}
+    login = util.login("EN0006-001", "second-key")
+    assert login.status_code == 200
+    assert login.json()['token'] != ""
+
+def test_delete_library_batch():
+    rows = [
+        {"fscs_id": "EN0008-001", "address": "9 Endor Place, Endor, 90000",
+         "name": "TREE HOUSE, ENDOR PUBLIC LIBRARY", "api_key": "tree-house-key"},
+        {"fscs_id": "EN0009-001", "address": "10 Endor Place, Endor, 10000",
+         "name": "GLIDER, ENDOR PUBLIC LIBRARY", "api_key": "glider-key"}
+    ]
+    util.insert_library("libraries", rows)
+    r = util.post_rpc("delete_library", [{"fscs_id": "EN0008-001"}, {"fscs_id": "EN0009-001"}])
+    assert r == {'libraries_deleted': 2, 'users_deleted': 2}
+    for row in rows:
+        assert not util.check_library_exists(row, "fscs_id")
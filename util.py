@@ -50,10 +50,17 @@ def get_login_token():
     username = os.getenv("ADMIN_USERNAME")
     passphrase = os.getenv("ADMIN_PASSWORD")
     logger.info("get_login_token")
+    r = login(username, passphrase)
+    return r.json()['token']
+
+# Calls the login RPC for any user, and returns the raw response.
+# A bad username or API key comes back as a non-200 status code.
+def login(username, api_key):
     r = requests.post(construct_postgrest_url("rpc/login"),
-        json={"username": username, "api_key": passphrase},
+        json={"username": username, "api_key": api_key},
         headers={"Content-Type": "application/json"})
-    return r.json()['token']
+    logger.info("login - status code {}".format(r.status_code))
+    return r
 
 # Querying data takes a particular form in Postgrest. This aids, a bit,
 # in constructing query URLs. See the Postgrest docs for more.
@@ -97,9 +104,10 @@ def get_library_data(fscs_id):
     # FIXME: Now it is, in this little data model. It might not be elsewhere.
     return r
 
-# Inserts a library into a given table via the insert_library API call.
-def insert_library(table, row):
-    url = construct_postgrest_url("rpc/insert_library".format(table))
+# Posts a JSON body to a Postgrest RPC as the admin user.
+# The library RPCs take either a single row (a dict) or a list of rows.
+def post_rpc(name, body):
+    url = construct_postgrest_url("rpc/{}".format(name))
     tok = get_login_token()
     r = requests.post(url, 
         headers={
@@ -107,10 +115,14 @@ def insert_library(table, row):
             "Authorization": "Bearer {}".format(tok),
             "Prefer": "params=single-object"
             },
-        json=row)
-    logger.info("insert_library - status code {}".format(r.status_code))
+        json=body)
+    logger.info("{} - status code {}".format(name, r.status_code))
     return r.json()
 
+# Inserts a library into a given table via the insert_library API call.
+def insert_library(table, row):
+    return post_rpc("insert_library", row)
+
 # Pulled from check.py
 
 # https://stackoverflow.com/questions/82831/how-do-i-check-whether-a-file-exists-without-exceptions